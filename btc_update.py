@@ -1,163 +1,352 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+from operator import itemgetter
 from datetime import datetime, timedelta, timezone
 import json
-import sys
-import shutil
+import mmap
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# orjson 이 설치되어 있으면 C 구현으로 encode/decode, 없으면 표준 json 사용
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # API 주소
 URL = 'https://blockchain.info/ticker'
 
+# keep-alive 커넥션을 재사용하는 세션 (일시적 오류는 재시도)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+))
+SESSION.headers.update({
+    "Accept-Encoding": "gzip",
+    "User-Agent": "btc-tracker/1.0",
+    "Connection": "keep-alive",
+})
+
+# 한국 표준시 및 timestamp 형식
+KST = timezone(timedelta(hours=9))
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 # 타겟 currency
 usd = "USD"
 kor = "KRW"
 
 # 파일 경로
 README_PATH = "README.md"
-HISTORY_PATH = "history.txt"
+HISTORY_PATH = "history.jsonl"
+TICKER_CACHE_PATH = "ticker.cache.json"
+
+# README 의 고정 문구 (차트/가격/시간 사이에 들어가는 부분)
+README_HEADER = "# 📈 Bitcoin Price Tracker (ASCII Style)\n    ## USD 가격 변동 \n    "
+README_KRW_HEADER = "\n    ## KRW 가격 변동\n    "
+README_LABELS_HEADER = "\n    📋 가격 기록:\n    "
+README_FOOTER = "\n    \n🕐 업데이트 시간 : "
+
+# 가격 기록 한 줄 형식 (timestamp, USD, KRW)
+PRICE_LABEL_FORMAT = "{}: USD {:,.2f} | KRW {:,.0f}"
+
+# README 에 표시할 최근 기록 개수
+HISTORY_SIZE = 10
+
+# 차트에 쓰는 ASCII 문자 (bytearray 에 직접 기록)
+NEWLINE = ord("\n")
+STAR = ord("*")
+UNDERSCORE = ord("_")
+SLASH = b"/"
+BACKSLASH = b"\\"
+
+# 캐시된 ticker 응답을 재사용하는 시간(초)
+TICKER_CACHE_TTL = 30
 
-def fetch_api(usd, kor) -> dict[str, object]:
+def json_dumps(obj) -> bytes:
     """
-    blockchain.com 에서 지원하는 통화별 비트코인 가격 변동 api
-    timestamp 와 함께 return
-    실패 시 빈 dict 반환
+    obj 를 UTF-8 JSON bytes 로 직렬화 (공백 없는 compact 형식)
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def json_loads(raw):
+    """
+    JSON bytes/str 을 파싱, 실패 시 ValueError 발생
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def load_ticker_cache():
+    """
+    TICKER_CACHE_TTL 초 이내에 저장된 ticker 응답이 있으면 반환
+    없거나 오래되었거나 읽을 수 없으면 None 반환
+    """
+    try:
+        if time.time() - os.path.getmtime(TICKER_CACHE_PATH) >= TICKER_CACHE_TTL:
+            return None
+        with open(TICKER_CACHE_PATH, "rb") as f:
+            return json_loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+def save_ticker_cache(data):
+    """
+    ticker 응답을 캐시 파일에 저장 (실패해도 무시)
     """
     try:
-        response = requests.get(URL, timeout=10)
+        with open(TICKER_CACHE_PATH, "wb") as f:
+            f.write(json_dumps(data))
+    except OSError as e:
+        log.warning("ticker 캐시 저장 실패: %s", e)
+
+def fetch_ticker(url):
+    """
+    공유 SESSION 으로 url 의 JSON 응답을 받아 파싱 후 return
+    네트워크 호출만 분리해 두어 다른 가격 소스를 추가할 때 그대로 재사용 가능
+    실패 시 None 반환
+    """
+    try:
+        response = SESSION.get(url, timeout=(3, 7))
         response.raise_for_status()  # 200이 아닌 경우 예외 발생
-        data = response.json()
+        return json_loads(response.content)
     except requests.RequestException as e:
-        print(f"[ERROR] API 요청 실패: {e}", file=sys.stderr)
-        return {}
+        log.error("API 요청 실패: %s", e)
     except ValueError as e:
-        print(f"[ERROR] JSON 파싱 실패: {e}", file=sys.stderr)
-        return {}
+        log.error("JSON 파싱 실패: %s", e)
+    return None
 
-    KST = timezone(timedelta(hours=9))
-    now = datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S")
+def get_last_price(data, currency):
+    """
+    ticker 응답에서 currency 의 "last" 가격을 꺼내 return
+    구조가 다르거나 숫자가 아니면 None 반환
+    """
+    if not isinstance(data, dict):
+        return None
+    entry = data.get(currency)
+    if not isinstance(entry, dict):
+        return None
+    last = entry.get("last")
+    if isinstance(last, bool) or not isinstance(last, (int, float)):
+        return None
+    return last
+
+def fetch_api(usd, kor, now_str) -> dict[str, object]:
+    """
+    blockchain.com 에서 지원하는 통화별 비트코인 가격 변동 api
+    now_str 을 timestamp 로 함께 return
+    TICKER_CACHE_TTL 초 이내의 캐시가 있으면 네트워크 요청 생략
+    실패 시 빈 dict 반환
+    """
+    # 캐시에 필요한 통화가 모두 있으면 그대로 사용
+    cached = load_ticker_cache()
+    if cached is not None:
+        usd_last = get_last_price(cached, usd)
+        kor_last = get_last_price(cached, kor)
+        if usd_last is not None and kor_last is not None:
+            return {
+                "timestamp": now_str,
+                "USD": usd_last,
+                "KRW": kor_last
+            }
+
+    data = fetch_ticker(URL)
+    if data is None:
+        return {}
 
     # 데이터 유효성 체크
-    if usd not in data or kor not in data:
-        print("[ERROR] 응답 데이터에 필요한 통화 정보가 없습니다.", file=sys.stderr)
+    usd_last = get_last_price(data, usd)
+    kor_last = get_last_price(data, kor)
+    if usd_last is None or kor_last is None:
+        log.error("응답 데이터에 필요한 통화 정보가 없습니다.")
         return {}
 
+    # 전체 통화 대신 필요한 통화만 캐시에 저장해서 다음 실행의 파싱량을 줄임
+    save_ticker_cache({usd: data[usd], kor: data[kor]})
+
     return {
-        "timestamp": now,
-        "USD": data[usd]["last"],
-        "KRW": data[kor]["last"]
+        "timestamp": now_str,
+        "USD": usd_last,
+        "KRW": kor_last
     }
 
+def read_tail_lines(path, count):
+    """
+    파일 끝에서부터 거꾸로 줄바꿈을 찾아 비어 있지 않은 마지막 count 줄을 return
+    mmap 으로 필요한 부분만 읽으므로 파일 크기와 무관하게 메모리 사용량이 일정
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lines = []
+            end = len(mm)
+            while end > 0 and len(lines) < count:
+                start = mm.rfind(b"\n", 0, end) + 1
+                line = mm[start:end]
+                if line.strip():
+                    lines.append(line)
+                end = start - 1
+
+    lines.reverse()
+    return lines
+
+def load_history():
+    """
+    history.jsonl 의 마지막 HISTORY_SIZE 줄만 읽어서 list 로 return
+    파일 전체를 읽지 않고 tail 만 파싱
+    파싱할 수 없는 줄은 건너뜀
+    """
+    if not os.path.exists(HISTORY_PATH):
+        return []
+
+    history = []
+    for line in read_tail_lines(HISTORY_PATH, HISTORY_SIZE):
+        try:
+            history.append(json_loads(line))
+        except ValueError:
+            log.warning("history.jsonl 파싱 실패 — 해당 줄을 건너뜁니다: %r", line)
+    return history
+
 def update_history(fetched_object):
     """
-    history.txt 업데이트
-    fetch_api 의 값이 {}이 아니라면 가장 오래된 timestamp 을 제외 후 해당 값 업데이트
-    최대 10개의 timestamp 만 보존
+    history.jsonl 업데이트
+    fetch_api 의 값이 {}이 아니라면 파일 끝에 한 줄로 append (기존 내용은 다시 쓰지 않음)
+    README 용으로 최근 HISTORY_SIZE 개의 기록을 return (건너뛴 경우 빈 list)
     """
     if not fetched_object:
-        print("[WARNING] 새 데이터가 없으므로 history 업데이트를 건너뜁니다.", file=sys.stderr)
-        return
+        log.warning("새 데이터가 없으므로 history 업데이트를 건너뜁니다.")
+        return []
 
-    history = []
-    if os.path.exists(HISTORY_PATH):
-        with open(HISTORY_PATH, "r", encoding="utf-8") as f:
-            try:
-                history = json.load(f)
-            except json.JSONDecodeError:
-                print("[ERROR] history.txt 파싱 실패 — 기존 파일 백업 후 새로 생성합니다.", file=sys.stderr)
-                shutil.copy(HISTORY_PATH, HISTORY_PATH + ".bak")
-                history = []
+    history = load_history()
 
-    history.append(fetched_object)
+    record = json_dumps(fetched_object) + b"\n"
+    with open(HISTORY_PATH, "a+b") as f:
+        # 마지막 줄이 줄바꿈 없이 끝났으면 (중간 종료, 웹 에디터 수정 등) 새 기록이 붙지 않도록 줄바꿈 추가
+        size = f.seek(0, os.SEEK_END)
+        if size:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                record = b"\n" + record
+        f.write(record)
 
-    if len(history) > 10:
-        history = history[-10:]
+    history.append(fetched_object)
+    return history[-HISTORY_SIZE:]
 
-    tmp_path = HISTORY_PATH + ".tmp"
-    with open(tmp_path, "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+def normalize(values, height):
+    """
+    가격 list 를 0 ~ height-1 사이의 차트 level 로 변환
+    가격은 센트 단위 정수로 바꾼 뒤 정수 연산만으로 계산
+    모든 값이 같으면 가운데 level 로 고정
+    """
+    cents = [round(v * 100) for v in values]
+    min_c, max_c = min(cents), max(cents)
+    if max_c == min_c:
+        return [height // 2] * len(cents)
 
-    os.replace(tmp_path, HISTORY_PATH)
+    span = max_c - min_c
+    scale = height - 1
+    return [((c - min_c) * scale) // span for c in cents]
 
-def update_readme():
+def make_ascii_line_chart(values, height=8):
     """
-    history.txt를 바탕으로 README.md를 ASCII 선 그래프로 업데이트
-    각 포인트는 '*'로 표시, 기울기는 '/' '\' 또는 '_'로 연결
+    Create an ASCII line chart from numeric values.
+    '*' marks actual data points.
+    '/' and '\' show slopes, '_' shows flat movement.
     """
-    if not os.path.exists(HISTORY_PATH):
-        print("[ERROR] history.txt 파일이 없습니다.", file=sys.stderr)
-        return
+    levels = normalize(values, height)
+    width = len(values)
+
+    # Flat price: a single '_..._*' line, no grid needed
+    if min(levels) == max(levels):
+        row = height - 1 - levels[0]
+        blank = " " * width
+        return "".join((
+            (blank + "\n") * row,
+            "_" * (width - 1), "*",
+            ("\n" + blank) * (height - 1 - row),
+        ))
+
+    # Flat byte buffer, one row per line (top row = highest value)
+    stride = width + 1
+    buf = bytearray(b" " * (height * stride - 1))
+    for r in range(height - 1):
+        buf[r * stride + width] = NEWLINE
 
-    with open(HISTORY_PATH, "r", encoding="utf-8") as f:
-        history = json.load(f)
+    for i, lvl in enumerate(levels):
+        row = height - 1 - lvl
+        buf[row * stride + i] = STAR
 
+        if i > 0:
+            prev_lvl = levels[i - 1]
+            prev_row = height - 1 - prev_lvl
+            # Slope cells in column i-1 are filled with one strided slice write
+            if lvl > prev_lvl:  # going up
+                buf[(row + 1) * stride + i - 1:prev_row * stride + i - 1:stride] = SLASH * (prev_row - row - 1)
+            elif lvl < prev_lvl:  # going down
+                buf[(prev_row + 1) * stride + i - 1:row * stride + i - 1:stride] = BACKSLASH * (row - prev_row - 1)
+            else:  # flat
+                buf[row * stride + i - 1] = UNDERSCORE
+
+    return buf.decode("ascii")
+
+def update_readme(history, now_str):
+    """
+    update_history 가 돌려준 history 를 바탕으로 README.md를 ASCII 선 그래프로 업데이트
+    업데이트 시간은 now_str 로 표시
+    각 포인트는 '*'로 표시, 기울기는 '/' '\' 또는 '_'로 연결
+    """
     if not history:
-        print("[ERROR] history.txt 가 비어 있습니다.", file=sys.stderr)
+        log.error("history 가 비어 있습니다.")
         return
 
-    usd_prices = [item["USD"] for item in history]
-    krw_prices = [item["KRW"] for item in history]
-    timestamps = [item["timestamp"] for item in history]
-
-    def make_ascii_line_chart(values, height=8):
-        """
-        Create an ASCII line chart from numeric values.
-        '*' marks actual data points.
-        '/' and '\' show slopes, '_' shows flat movement.
-        """
-        min_v, max_v = min(values), max(values)
-        if max_v == min_v:
-            levels = [height // 2] * len(values)
-        else:
-            levels = [int((v - min_v) / (max_v - min_v) * (height - 1)) for v in values]
-
-        # Create empty grid (top row = highest value)
-        grid = [[" " for _ in range(len(values))] for _ in range(height)]
-
-        for i, lvl in enumerate(levels):
-            row = height - 1 - lvl
-            grid[row][i] = "*"
-
-            if i > 0:
-                prev_lvl = levels[i - 1]
-                if lvl > prev_lvl:  # going up
-                    for y in range(height - 1 - prev_lvl - 1, row, -1):
-                        grid[y][i - 1] = "/"
-                elif lvl < prev_lvl:  # going down
-                    for y in range(row + 1, height - 1 - prev_lvl):
-                        grid[y][i - 1] = "\\"
-                else:  # flat
-                    grid[row][i - 1] = "_"
-
-        return "\n".join("".join(r) for r in grid)
+    usd_prices, krw_prices, timestamps = map(list, zip(*map(itemgetter("USD", "KRW", "timestamp"), history)))
 
     usd_chart = make_ascii_line_chart(usd_prices)
     krw_chart = make_ascii_line_chart(krw_prices)
 
-    price_labels = "\n".join(f"{t}: USD {u:,.2f} | KRW {k:,.0f}"
-                             for t, u, k in zip(timestamps, usd_prices, krw_prices))
-
-    KST = timezone(timedelta(hours=9))
-    now_str = datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S")
+    price_labels = "\n".join(map(PRICE_LABEL_FORMAT.format, timestamps, usd_prices, krw_prices))
 
-    readme_content = f"""# 📈 Bitcoin Price Tracker (ASCII Style)
-    ## USD 가격 변동 
-    {usd_chart}
-    ## KRW 가격 변동
-    {krw_chart}
-    📋 가격 기록:
-    {price_labels}
-    
-🕐 업데이트 시간 : {now_str} (KST)
-"""
+    readme_content = "".join((
+        README_HEADER, usd_chart,
+        README_KRW_HEADER, krw_chart,
+        README_LABELS_HEADER, price_labels,
+        README_FOOTER, now_str, " (KST)\n",
+    ))
 
-    with open(README_PATH, "w", encoding="utf-8") as f:
+    # 임시 파일에 다 쓴 뒤 교체해서 중간에 종료돼도 README 가 깨지지 않도록 함
+    tmp_path = README_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         f.write(readme_content)
+        f.flush()
+        os.fsync(f.fileno())
 
-if __name__ == "__main__":
-    data = fetch_api(usd, kor)
+    os.replace(tmp_path, README_PATH)
+
+def main():
+    # 알 수 없는 LOG_LEVEL 값이면 실행을 멈추지 않고 WARNING 으로 대체
+    level = logging.getLevelName(os.getenv("LOG_LEVEL", "WARNING").upper())
+    if not isinstance(level, int):
+        level = logging.WARNING
+    logging.basicConfig(level=level, format="[%(levelname)s] %(message)s")
+
+    # 기록과 README 에 같은 시간이 찍히도록 한 번만 계산
+    now_str = datetime.now(KST).strftime(TIMESTAMP_FORMAT)
+
+    data = fetch_api(usd, kor, now_str)
     print("Fetched data:", data)
     if data:
-        update_history(data)
-        update_readme()
+        history = update_history(data)
+        update_readme(history, now_str)
     else:
-        print("[ERROR] 데이터 수집 실패로 업데이트 건너뜀", file=sys.stderr)
\ No newline at end of file
+        log.error("데이터 수집 실패로 업데이트 건너뜀")
+
+if __name__ == "__main__":
+    main()